@@ -1,31 +1,61 @@
 """Configuration management for the RTSP stream server."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CameraConfig:
     """Camera configuration optimized for Pi 3B+ with H.264."""
-    resolution = (1280, 720)  # 720p - good balance for Pi 3B+
-    format = "YUV420"  # Required for H.264 encoding
+    resolution: tuple = (1280, 720)  # 720p - good balance for Pi 3B+
+    lores_resolution: tuple = (320, 180)  # Motion detection stream; keep the same aspect ratio
+    format: str = "YUV420"  # Required for H.264 encoding
+    bitrate: int = 1000000  # 1 Mbps H.264
+    iperiod: int = 30  # Keyframe interval in frames
+    capture_cpus: tuple = (3,)  # Cores for the frame capture thread; () leaves it unpinned
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
+class MotionConfig:
+    """OpenCV motion detection settings."""
+    min_area: int = 8000  # Minimum contour area (pixels) counted as motion
+    threshold: int = 25  # Per-pixel intensity delta treated as changed
+    exclude_regions: tuple = ((0, 0, 200, 200),)  # (x, y, w, h) boxes ignored by detection
+    detect_width: int = 320  # Frames are downscaled to this width before detection
+    cv_threads: int = 2  # OpenCV worker threads; keep <= len(cpus) when detection is pinned
+    three_frame: bool = True  # Require change across two consecutive diffs to suppress ghosting
+    detect_every: int = 2  # Run detection on every Nth frame and reuse its result in between
+    cpus: tuple = (1, 2)  # Cores for detection and its OpenCV workers, which inherit the pinning; () leaves it unpinned
+
+
+@dataclass(slots=True, frozen=True)
+class EventConfig:
+    """Motion event recording settings."""
+    camera_name: str = "pi_cam1"
+    output_dir: str = "./events"
+    fps: int = 10  # Motion loop rate and saved clip frame rate
+    pre_event_sec: int = 5  # Seconds of footage kept before motion starts
+    post_event_sec: int = 5  # Seconds of quiet before an event is closed
+
+
+@dataclass(slots=True, frozen=True)
+class MqttConfig:
+    """MQTT event notification settings."""
+    host: str = "10.0.4.40"
+    port: int = 1883
+
+
+@dataclass(slots=True, frozen=True)
 class ServerConfig:
     """RTSP server configuration."""
-    host = ""  # Bind to all interfaces
-    port = 8554  # Non-privileged RTSP port (554 requires root)
+    host: str = ""  # Bind to all interfaces
+    port: int = 8554  # Non-privileged RTSP port (554 requires root)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AppConfig:
     """Main application configuration."""
-    camera = None
-    server = None
-    
-    def __post_init__(self):
-        """Initialize sub-configs if not provided."""
-        if self.camera is None:
-            self.camera = CameraConfig()
-        if self.server is None:
-            self.server = ServerConfig()
\ No newline at end of file
+    camera: CameraConfig = field(default_factory=CameraConfig)
+    motion: MotionConfig = field(default_factory=MotionConfig)
+    event: EventConfig = field(default_factory=EventConfig)
+    mqtt: MqttConfig = field(default_factory=MqttConfig)
+    server: ServerConfig = field(default_factory=ServerConfig)
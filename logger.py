@@ -1,11 +1,98 @@
 """Simplified logging configuration for the RTSP stream server."""
 
+import atexit
+import io
 import logging
+import os
+import queue
 import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
 
+# Background listener that drains queued records to the log files
+listener = None
+# Signals the periodic flush thread of the current setup to exit
+_flush_stop = None
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """FileHandler that batches records in a large buffer instead of flushing each one.
+
+    The file is opened O_APPEND so each flushed write lands atomically at the
+    end of the log, and O_CLOEXEC so the descriptor never leaks into children.
+    """
+
+    buffer_size = 1 << 20
+
+    def _open(self):
+        flags = os.O_WRONLY | os.O_CREAT | os.O_CLOEXEC
+        flags |= os.O_APPEND if 'a' in self.mode else os.O_TRUNC
+        fd = os.open(self.baseFilename, flags, 0o644)
+        raw = io.FileIO(fd, 'a' if 'a' in self.mode else 'w', closefd=True)
+        return io.TextIOWrapper(
+            io.BufferedWriter(raw, buffer_size=self.buffer_size),
+            encoding=self.encoding or 'utf-8',
+            errors=self.errors
+        )
+
+    def emit(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+def _flush_periodically(handlers, stop, interval):
+    """Flush buffered handlers every interval seconds until stop is set."""
+    while not stop.wait(interval):
+        for handler in handlers:
+            handler.flush()
+
+
+def _stop_listener():
+    """Stop the current listener and close the file handlers it owns."""
+    global listener
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    listener = None
+
+
+# Registered once; it always stops whichever listener is current at exit
+atexit.register(_stop_listener)
+
+
+def _handle_exception(exc_type, exc_value, exc_traceback):
+    """Log uncaught exceptions through the root logger."""
+    if issubclass(exc_type, KeyboardInterrupt):
+        sys.__excepthook__(exc_type, exc_value, exc_traceback)
+        return
+    logging.getLogger().critical("Uncaught exception", exc_info=(exc_type, exc_value, exc_traceback))
+
+
+def _handle_thread_exception(args):
+    """Route uncaught thread exceptions to _handle_exception."""
+    if args.exc_type is SystemExit:
+        return
+    _handle_exception(args.exc_type, args.exc_value, args.exc_traceback)
+
+
+def setup_logging(log_dir='/tmp', console_level=logging.INFO):
+    """Set up logging for the RTSP server and its helper scripts.
+
+    Args:
+        log_dir: Directory for streamserver.log and streamserver_errors.log,
+            or None to log to the console only.
+        console_level: Minimum level echoed to stdout.
+    """
+    global listener, _flush_stop
 
-def setup_logging():
-    """Set up basic logging configuration for RTSP server."""
     # Simple logging to files in /tmp for easy access
     formatter = logging.Formatter(
         fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -19,35 +106,50 @@ def setup_logging():
     # Remove existing handlers
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
+        handler.close()
+    _stop_listener()
+    if _flush_stop is not None:
+        _flush_stop.set()
+        _flush_stop = None
     
     # Console handler for INFO and above
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
+    console_handler.setLevel(console_level)
     console_handler.setFormatter(formatter)
     root_logger.addHandler(console_handler)
     
-    # Main log file (all messages)
-    file_handler = logging.FileHandler('/tmp/streamserver.log', mode='a')
-    file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(formatter)
-    root_logger.addHandler(file_handler)
-    
-    # Error-only log file
-    error_handler = logging.FileHandler('/tmp/streamserver_errors.log', mode='a')
-    error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(formatter)
-    root_logger.addHandler(error_handler)
-    
-    # Capture uncaught exceptions
-    def handle_exception(exc_type, exc_value, exc_traceback):
-        if issubclass(exc_type, KeyboardInterrupt):
-            sys.__excepthook__(exc_type, exc_value, exc_traceback)
-            return
-        root_logger.critical("Uncaught exception", exc_info=(exc_type, exc_value, exc_traceback))
+    if log_dir is not None:
+        # Main log file (all messages)
+        file_handler = BufferedFileHandler(os.path.join(log_dir, 'streamserver.log'), mode='a')
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(formatter)
+        
+        # Error-only log file, written and flushed synchronously per record so the
+        # last errors survive a SIGTERM or a native crash; errors are rare
+        error_handler = logging.FileHandler(os.path.join(log_dir, 'streamserver_errors.log'), mode='a')
+        error_handler.setLevel(logging.ERROR)
+        error_handler.setFormatter(formatter)
+        root_logger.addHandler(error_handler)
+        
+        # Main log writes happen on the listener thread so logging callers only enqueue
+        log_queue = queue.SimpleQueue()
+        root_logger.addHandler(QueueHandler(log_queue))
+        listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        listener.start()
+        
+        # The buffered main log is flushed once a second rather than once per record
+        _flush_stop = threading.Event()
+        threading.Thread(
+            target=_flush_periodically,
+            args=((file_handler,), _flush_stop, 1.0),
+            daemon=True
+        ).start()
     
-    sys.excepthook = handle_exception
+    # Capture uncaught exceptions, including those raised in background threads
+    sys.excepthook = _handle_exception
+    threading.excepthook = _handle_thread_exception
 
 
 def get_logger(name):
     """Get a logger with the specified name."""
-    return logging.getLogger(name)
\ No newline at end of file
+    return logging.getLogger(name)
@@ -4,141 +4,151 @@ Simple RTSP client to test the server functionality.
 This helps diagnose RTSP issues without relying on VLC.
 """
 
+import re
 import socket
+import struct
 import time
 
+# RTSP request templates, filled with (ip, port, cseq[, session])
+OPTIONS_TMPL = (
+    b"OPTIONS rtsp://%s:%d/stream RTSP/1.0\r\n"
+    b"CSeq: %d\r\n"
+    b"User-Agent: TestClient/1.0\r\n"
+    b"\r\n"
+)
+DESCRIBE_TMPL = (
+    b"DESCRIBE rtsp://%s:%d/stream RTSP/1.0\r\n"
+    b"CSeq: %d\r\n"
+    b"Accept: application/sdp\r\n"
+    b"User-Agent: TestClient/1.0\r\n"
+    b"\r\n"
+)
+SETUP_TMPL = (
+    b"SETUP rtsp://%s:%d/stream/track1 RTSP/1.0\r\n"
+    b"CSeq: %d\r\n"
+    b"Transport: RTP/AVP/UDP;unicast;client_port=5004-5005\r\n"
+    b"User-Agent: TestClient/1.0\r\n"
+    b"\r\n"
+)
+PLAY_TMPL = (
+    b"PLAY rtsp://%s:%d/stream RTSP/1.0\r\n"
+    b"CSeq: %d\r\n"
+    b"Session: %s\r\n"
+    b"Range: npt=0-\r\n"
+    b"User-Agent: TestClient/1.0\r\n"
+    b"\r\n"
+)
+TEARDOWN_TMPL = (
+    b"TEARDOWN rtsp://%s:%d/stream RTSP/1.0\r\n"
+    b"CSeq: %d\r\n"
+    b"Session: %s\r\n"
+    b"User-Agent: TestClient/1.0\r\n"
+    b"\r\n"
+)
+
+# Session id from a SETUP response, without any ";timeout=" parameter
+SESSION_RE = re.compile(rb'^Session:\s*([^\r;]+)', re.M)
+# Fixed 12-byte RTP header: V/P/X/CC, M/PT, sequence, timestamp, SSRC
+RTP_HDR = struct.Struct('!BBHII')
+
 def test_rtsp_full_session():
     """Test a complete RTSP session."""
     server_ip = "10.0.4.67"  # Change this to your Pi's IP
     server_port = 8554
+    host = server_ip.encode()
     
     try:
         print(f"🔌 Connecting to RTSP server at {server_ip}:{server_port}")
         
         # Connect to RTSP server
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(10.0)
-        sock.connect((server_ip, server_port))
-        print("✅ Connected to RTSP server")
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.settimeout(10.0)
+            sock.connect((server_ip, server_port))
+            print("✅ Connected to RTSP server")
         
-        # 1. OPTIONS request
-        print("\n📡 Sending OPTIONS request...")
-        options_request = (
-            f"OPTIONS rtsp://{server_ip}:{server_port}/stream RTSP/1.0\r\n"
-            f"CSeq: 1\r\n"
-            f"User-Agent: TestClient/1.0\r\n"
-            f"\r\n"
-        )
-        sock.send(options_request.encode())
-        response = sock.recv(1024).decode()
-        print(f"📨 OPTIONS Response:\n{response}")
+            # 1. OPTIONS request
+            print("\n📡 Sending OPTIONS request...")
+            sock.sendall(OPTIONS_TMPL % (host, server_port, 1))
+            response = sock.recv(1024).decode()
+            print(f"📨 OPTIONS Response:\n{response}")
         
-        # 2. DESCRIBE request
-        print("\n📡 Sending DESCRIBE request...")
-        describe_request = (
-            f"DESCRIBE rtsp://{server_ip}:{server_port}/stream RTSP/1.0\r\n"
-            f"CSeq: 2\r\n"
-            f"Accept: application/sdp\r\n"
-            f"User-Agent: TestClient/1.0\r\n"
-            f"\r\n"
-        )
-        sock.send(describe_request.encode())
-        response = sock.recv(2048).decode()
-        print(f"📨 DESCRIBE Response:\n{response}")
+            # 2. DESCRIBE request
+            print("\n📡 Sending DESCRIBE request...")
+            sock.sendall(DESCRIBE_TMPL % (host, server_port, 2))
+            response = sock.recv(2048).decode()
+            print(f"📨 DESCRIBE Response:\n{response}")
         
-        # 3. SETUP request
-        print("\n📡 Sending SETUP request...")
-        setup_request = (
-            f"SETUP rtsp://{server_ip}:{server_port}/stream/track1 RTSP/1.0\r\n"
-            f"CSeq: 3\r\n"
-            f"Transport: RTP/AVP/UDP;unicast;client_port=5004-5005\r\n"
-            f"User-Agent: TestClient/1.0\r\n"
-            f"\r\n"
-        )
-        sock.send(setup_request.encode())
-        response = sock.recv(1024).decode()
-        print(f"📨 SETUP Response:\n{response}")
+            # 3. SETUP request
+            print("\n📡 Sending SETUP request...")
+            sock.sendall(SETUP_TMPL % (host, server_port, 3))
+            response = sock.recv(1024)
+            print(f"📨 SETUP Response:\n{response.decode(errors='replace')}")
         
-        # Extract session ID
-        session_id = None
-        for line in response.split('\r\n'):
-            if line.startswith('Session:'):
-                session_id = line.split(':')[1].strip()
-                break
+            # Extract session ID
+            match = SESSION_RE.search(response)
+            session_id = match.group(1).strip().decode() if match else None
         
-        if not session_id:
-            print("❌ No session ID received!")
-            return
+            if not session_id:
+                print("❌ No session ID received!")
+                return
             
-        print(f"📋 Session ID: {session_id}")
+            print(f"📋 Session ID: {session_id}")
         
-        # 4. PLAY request
-        print("\n📡 Sending PLAY request...")
-        play_request = (
-            f"PLAY rtsp://{server_ip}:{server_port}/stream RTSP/1.0\r\n"
-            f"CSeq: 4\r\n"
-            f"Session: {session_id}\r\n"
-            f"Range: npt=0-\r\n"
-            f"User-Agent: TestClient/1.0\r\n"
-            f"\r\n"
-        )
-        sock.send(play_request.encode())
-        response = sock.recv(1024).decode()
-        print(f"📨 PLAY Response:\n{response}")
+            # 4. PLAY request
+            print("\n📡 Sending PLAY request...")
+            sock.sendall(PLAY_TMPL % (host, server_port, 4, session_id.encode()))
+            response = sock.recv(1024).decode()
+            print(f"📨 PLAY Response:\n{response}")
         
-        if "200 OK" in response:
-            print("✅ PLAY successful - stream should be active")
+            if "200 OK" in response:
+                print("✅ PLAY successful - stream should be active")
             
-            # Set up UDP socket to listen for RTP
-            print("\n📡 Setting up RTP listener on port 5004...")
-            rtp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            rtp_sock.settimeout(5.0)
-            rtp_sock.bind(('', 5004))
+                # Set up UDP socket to listen for RTP
+                print("\n📡 Setting up RTP listener on port 5004...")
+                with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as rtp_sock:
+                    rtp_sock.settimeout(5.0)
+                    # Let back-to-back test runs rebind the RTP port immediately
+                    rtp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                    if hasattr(socket, "SO_REUSEPORT"):
+                        rtp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+                    rtp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+                    rtp_sock.bind(('', 5004))
+                    # Reused receive buffer so each packet avoids a fresh allocation
+                    packet_buf = bytearray(2048)
             
-            print("📡 Listening for RTP packets...")
-            packet_count = 0
-            start_time = time.time()
+                    print("📡 Listening for RTP packets...")
+                    packet_count = 0
+                    start_time = time.time()
             
-            try:
-                while packet_count < 10 and time.time() - start_time < 30:
-                    data, addr = rtp_sock.recvfrom(2048)
-                    packet_count += 1
-                    print(f"📦 RTP packet {packet_count}: {len(data)} bytes from {addr}")
+                    try:
+                        while packet_count < 10 and time.time() - start_time < 30:
+                            nbytes, addr = rtp_sock.recvfrom_into(packet_buf)
+                            packet_count += 1
+                            print(f"📦 RTP packet {packet_count}: {nbytes} bytes from {addr}")
                     
-                    # Parse RTP header
-                    if len(data) >= 12:
-                        version = (data[0] >> 6) & 0x3
-                        payload_type = data[1] & 0x7f
-                        seq_num = int.from_bytes(data[2:4], 'big')
-                        timestamp = int.from_bytes(data[4:8], 'big')
-                        print(f"   📋 RTP: v={version}, pt={payload_type}, seq={seq_num}, ts={timestamp}")
+                            # Parse RTP header
+                            if nbytes >= RTP_HDR.size:
+                                b0, b1, seq_num, timestamp, ssrc = RTP_HDR.unpack_from(packet_buf)
+                                version = b0 >> 6
+                                payload_type = b1 & 0x7f
+                                print(f"   📋 RTP: v={version}, pt={payload_type}, seq={seq_num}, ts={timestamp}")
                         
-            except socket.timeout:
-                print("⏰ Timeout waiting for RTP packets")
-            
-            rtp_sock.close()
+                    except socket.timeout:
+                        print("⏰ Timeout waiting for RTP packets")
             
-            if packet_count > 0:
-                print(f"✅ Received {packet_count} RTP packets - stream is working!")
+                if packet_count > 0:
+                    print(f"✅ Received {packet_count} RTP packets - stream is working!")
+                else:
+                    print("❌ No RTP packets received - there's an issue with the stream")
             else:
-                print("❌ No RTP packets received - there's an issue with the stream")
-        else:
-            print("❌ PLAY request failed")
+                print("❌ PLAY request failed")
             
-        # 5. TEARDOWN
-        print("\n📡 Sending TEARDOWN request...")
-        teardown_request = (
-            f"TEARDOWN rtsp://{server_ip}:{server_port}/stream RTSP/1.0\r\n"
-            f"CSeq: 5\r\n"
-            f"Session: {session_id}\r\n"
-            f"User-Agent: TestClient/1.0\r\n"
-            f"\r\n"
-        )
-        sock.send(teardown_request.encode())
-        response = sock.recv(1024).decode()
-        print(f"📨 TEARDOWN Response:\n{response}")
+            # 5. TEARDOWN
+            print("\n📡 Sending TEARDOWN request...")
+            sock.sendall(TEARDOWN_TMPL % (host, server_port, 5, session_id.encode()))
+            response = sock.recv(1024).decode()
+            print(f"📨 TEARDOWN Response:\n{response}")
         
-        sock.close()
         print("🔌 Connection closed")
         
     except Exception as e:
@@ -6,6 +6,7 @@ Includes OpenCV-based motion detection, region exclusion, event video saving, MQ
 """
 
 import io
+import json
 import os
 import cv2
 import numpy as np
@@ -13,9 +14,9 @@ import socket
 import struct
 import threading
 import time
+import queue
 import random
 import collections
-from datetime import datetime
 import glob
 try:
     import paho.mqtt.publish as publish
@@ -40,41 +41,162 @@ logger = get_logger(__name__)
 if not verify_picamera2():
     raise ImportError("Picamera2 is required but not available")
 
+# Named pipe shared by the H.264 encoder output and the GStreamer RTSP source
+FIFO_PATH = "/tmp/picamera2_stream_fifo.h264"
+# Codec for saved event clips, resolved once rather than per clip
+EVENT_FOURCC = cv2.VideoWriter_fourcc(*'mp4v')
+
+def get_ip():
+    """Resolve the outbound interface address.
+
+    Not cached: at boot the network may not be up yet, and a DHCP change
+    should show up in later events. This runs once per event.
+    """
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("8.8.8.8", 80))
+            return s.getsockname()[0]
+    except Exception:
+        return "localhost"
+
+def lower_thread_priority(niceness=10):
+    """Demote the calling thread so camera, encoder and RTSP threads win the CPU.
+
+    On Linux the scheduler and nice value apply to the calling thread only.
+    """
+    try:
+        if hasattr(os, "SCHED_BATCH"):
+            os.sched_setscheduler(0, os.SCHED_BATCH, os.sched_param(0))
+        os.nice(niceness)
+    except OSError as e:
+        logger.warning("Could not lower thread priority: %s", e)
+
+def pin_thread(cpus):
+    """Restrict the calling thread to cpus, ignoring cores this machine does not have."""
+    available = os.sched_getaffinity(0)
+    cpus = set(cpus) & available
+    if not cpus or cpus == available:
+        return
+    try:
+        os.sched_setaffinity(0, cpus)
+    except OSError as e:
+        logger.warning("Could not pin thread to CPUs %s: %s", sorted(cpus), e)
+
 # --- Motion Detection ---
 class MotionDetector:
-    def __init__(self, exclude_regions=None, min_area=5000):
+    def __init__(self, exclude_regions=None, min_area=5000, threshold=25, detect_width=None,
+                 cv_threads=None, source_width=None, three_frame=False):
         self.prev_gray = None
         self.exclude_regions = exclude_regions or []
         self.min_area = min_area
+        self.threshold = threshold
+        # Frames wider than this are shrunk before detection (None keeps full size)
+        self.detect_width = detect_width
+        # Width of the frame that exclude_regions and returned boxes refer to,
+        # when detection is fed a smaller stream (None means the input frame)
+        self.source_width = source_width
+        # Three-frame differencing ANDs the current diff with the previous one,
+        # so only pixels changed in both count and trailing "ghosts" drop out
+        self.three_frame = three_frame
+        self._prev_thresh = None
+        self.dilate_kernel = np.ones((3, 3), dtype="uint8")
+        self._mask = None
+        # Scratch arrays reused across frames instead of allocating per call
+        self._bufs = None
+        self._slot = 0
+        # OpenCV's pool defaults to one thread per core, which oversubscribes
+        # the Pi alongside the camera, encoder and RTSP threads
+        cv2.setUseOptimized(True)
+        if cv_threads is not None:
+            cv2.setNumThreads(cv_threads)
 
     def set_exclude_regions(self, regions):
         self.exclude_regions = regions
+        self._mask = None
 
-    def apply_exclusion_mask(self, frame):
-        mask = np.ones(frame.shape[:2], dtype="uint8") * 255
+    def apply_exclusion_mask(self, frame, scale=1.0):
+        mask = np.full(frame.shape[:2], 255, dtype="uint8")
         for (x, y, w, h) in self.exclude_regions:
+            x, y, w, h = (int(round(v * scale)) for v in (x, y, w, h))
             mask[y:y+h, x:x+w] = 0
         return mask
 
+    def _work_buffers(self, frame_shape):
+        """Return scratch arrays for frames of this shape, allocating them only on a size change."""
+        if self._bufs is None or self._bufs['shape'] != frame_shape:
+            h, w = frame_shape[:2]
+            small = None
+            if self.detect_width and w > self.detect_width:
+                h, w = round(h * self.detect_width / w), self.detect_width
+                small = np.empty((h, w) + frame_shape[2:], dtype="uint8")
+            # masked and thresh are double-buffered: one holds the previous frame's result
+            self._bufs = {
+                'shape': frame_shape,
+                'small': small,
+                'gray': np.empty((h, w), dtype="uint8"),
+                'masked': [np.zeros((h, w), dtype="uint8") for _ in range(2)],
+                'delta': np.empty((h, w), dtype="uint8"),
+                'thresh': [np.empty((h, w), dtype="uint8") for _ in range(2)],
+                'both': np.empty((h, w), dtype="uint8"),
+                'dilated': np.empty((h, w), dtype="uint8"),
+            }
+            self._slot = 0
+            self._mask = None
+            self.prev_gray = None
+            self._prev_thresh = None
+        return self._bufs
+
     def detect(self, frame):
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (21, 21), 0)
-        mask = self.apply_exclusion_mask(gray)
-        masked_gray = cv2.bitwise_and(gray, gray, mask=mask)
+        source_width = self.source_width or frame.shape[1]
+        bufs = self._work_buffers(frame.shape)
+        if bufs['small'] is not None:
+            frame = cv2.resize(frame, bufs['small'].shape[1::-1], dst=bufs['small'],
+                               interpolation=cv2.INTER_AREA)
+        scale = frame.shape[1] / source_width
+        blur_size = max(3, int(21 * scale) | 1)
+        # Single-channel input (e.g. the Y plane of a YUV frame) is already grayscale
+        if frame.ndim == 2:
+            gray = cv2.GaussianBlur(frame, (blur_size, blur_size), 0, dst=bufs['gray'])
+        else:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=bufs['gray'])
+            cv2.GaussianBlur(gray, (blur_size, blur_size), 0, dst=gray)
+        # The exclusion mask only depends on frame size, so build it once
+        if self._mask is None or self._mask.shape != gray.shape:
+            self._mask = self.apply_exclusion_mask(gray, scale)
+            # A masked bitwise_and leaves excluded pixels of dst untouched, so clear them
+            for masked in bufs['masked']:
+                masked.fill(0)
+            # That wipes the previous frame too, so re-prime rather than diff against zeros
+            self.prev_gray = None
+            self._prev_thresh = None
+        slot = self._slot
+        masked_gray = cv2.bitwise_and(gray, gray, dst=bufs['masked'][slot], mask=self._mask)
         motion_found = False
         motion_boxes = []
         if self.prev_gray is not None:
-            frame_delta = cv2.absdiff(self.prev_gray, masked_gray)
-            thresh = cv2.threshold(frame_delta, 25, 255, cv2.THRESH_BINARY)[1]
-            thresh = cv2.dilate(thresh, None, iterations=2)
-            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            for c in contours:
-                if cv2.contourArea(c) < self.min_area:
-                    continue
-                (x, y, w, h) = cv2.boundingRect(c)
-                motion_boxes.append((x, y, w, h))
-                motion_found = True
-        self.prev_gray = masked_gray.copy()
+            frame_delta = cv2.absdiff(self.prev_gray, masked_gray, dst=bufs['delta'])
+            thresh = cv2.threshold(frame_delta, self.threshold, 255, cv2.THRESH_BINARY,
+                                   dst=bufs['thresh'][slot])[1]
+            if self.three_frame:
+                # Keep this diff for the next frame; each frame costs a single absdiff
+                prev_thresh, self._prev_thresh = self._prev_thresh, thresh
+                if prev_thresh is None:
+                    thresh = None
+                else:
+                    thresh = cv2.bitwise_and(thresh, prev_thresh, dst=bufs['both'])
+            # A static scene leaves the delta empty; skip dilation and labelling
+            if thresh is not None and cv2.countNonZero(thresh):
+                thresh = cv2.dilate(thresh, self.dilate_kernel, dst=bufs['dilated'], iterations=2)
+                # Label 0 is the background; stats rows are (x, y, w, h, area)
+                _, _, stats, _ = cv2.connectedComponentsWithStats(thresh, connectivity=8)
+                blobs = stats[1:]
+                boxes = blobs[blobs[:, cv2.CC_STAT_AREA] >= self.min_area * scale * scale, :4]
+                if scale != 1.0:
+                    boxes = np.round(boxes / scale).astype(int)
+                motion_boxes = [tuple(box) for box in boxes.tolist()]
+                motion_found = bool(motion_boxes)
+        self.prev_gray = masked_gray
+        self._slot = slot ^ 1
         return motion_found, motion_boxes
 
     def draw_exclusion_boxes(self, frame):
@@ -87,20 +209,24 @@ def initialize_camera(config):
     try:
         logger.info("📷 Initializing Picamera2 with H.264 hardware encoding...")
         picam2 = Picamera2()
+        # The hardware encoder consumes main; motion detection reads the small lores stream
         video_config = picam2.create_video_configuration(
-            main={"size": config.camera.resolution, "format": "YUV420"}
+            main={"size": config.camera.resolution, "format": config.camera.format},
+            lores={"size": config.camera.lores_resolution, "format": "YUV420"}
         )
         picam2.configure(video_config)
         encoder = H264Encoder(
-            bitrate=1000000,
+            bitrate=config.camera.bitrate,
             repeat=True,
-            iperiod=30
+            iperiod=config.camera.iperiod
         )
         logger.info(f"✅ Camera initialized: {config.camera.resolution} with H.264 hardware encoding")
         # Create named pipe for RTSP streaming
-        fifo_path = "/tmp/picamera2_stream_fifo.h264"
-        if os.path.exists(fifo_path):
+        fifo_path = FIFO_PATH
+        try:
             os.remove(fifo_path)
+        except FileNotFoundError:
+            pass
         os.mkfifo(fifo_path)
         logger.info(f"🛠️ Created named pipe for RTSP streaming: {fifo_path}")
         return picam2, encoder, fifo_path
@@ -109,35 +235,34 @@ def initialize_camera(config):
         raise CameraError(f"Failed to initialize camera: {e}")
 
 # --- Main Streaming Logic ---
-def start_camera_streaming(picam2, encoder, output):
-    CAMERA_NAME = "pi_cam1"
-    VIDEO_DIR = "./events"
+def start_camera_streaming(picam2, encoder, output, config):
+    CAMERA_NAME = config.event.camera_name
+    VIDEO_DIR = config.event.output_dir
     os.makedirs(VIDEO_DIR, exist_ok=True)
-    FPS = 10
-    PRE_EVENT_SEC = 5
-    POST_EVENT_SEC = 5
+    FPS = config.event.fps
+    PRE_EVENT_SEC = config.event.pre_event_sec
+    POST_EVENT_SEC = config.event.post_event_sec
     buffer_len = FPS * PRE_EVENT_SEC
     frame_buffer = collections.deque(maxlen=buffer_len)
     recording_event = {'active': False}
     post_event_frames = {'count': 0}
-    exclude_regions = [(0, 0, 200, 200)]
-    motion_detector = MotionDetector(exclude_regions=exclude_regions, min_area=8000)
+    motion_detector = MotionDetector(
+        exclude_regions=list(config.motion.exclude_regions),
+        min_area=config.motion.min_area,
+        threshold=config.motion.threshold,
+        detect_width=config.motion.detect_width,
+        cv_threads=config.motion.cv_threads,
+        source_width=config.camera.resolution[0],
+        three_frame=config.motion.three_frame
+    )
+    main_w, main_h = config.camera.resolution
+    lores_w, lores_h = config.camera.lores_resolution
 
     # If output is a tuple (file_path, fifo_path), split it
     fifo_path = None
     if isinstance(output, tuple):
         output, fifo_path = output
 
-    def get_ip():
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80))
-            ip = s.getsockname()[0]
-            s.close()
-            return ip
-        except Exception:
-            return "localhost"
-
     def send_mqtt_event(camera_name, ts, filepath):
         if publish is None:
             logger.warning("paho-mqtt not installed, cannot send MQTT event")
@@ -151,58 +276,133 @@ def start_camera_streaming(picam2, encoder, output):
             "ip": ip
         }
         try:
-            publish.single(topic, str(payload), hostname="10.0.4.40", port=1883)
+            publish.single(topic, json.dumps(payload, separators=(",", ":")),
+                           hostname=config.mqtt.host, port=config.mqtt.port)
             logger.info(f"📡 MQTT event sent: {payload}")
         except Exception as e:
             logger.error(f"MQTT publish failed: {e}")
 
+    def render_event_frame(main_yuv, motion_boxes):
+        # Arrays may carry stride padding past the visible width
+        frame_bgr = cv2.cvtColor(main_yuv, cv2.COLOR_YUV2BGR_I420)[:main_h, :main_w]
+        motion_detector.draw_exclusion_boxes(frame_bgr)
+        for (x, y, w, h) in motion_boxes:
+            cv2.rectangle(frame_bgr, (x, y), (x+w, y+h), (0, 255, 0), 2)
+        return frame_bgr
+
     def save_event_video(frames, event_time):
-        ts = event_time.strftime("%Y%m%d_%H%M%S")
+        ts = time.strftime("%Y%m%d_%H%M%S", time.localtime(event_time))
         filename = f"{CAMERA_NAME}_{ts}.mp4"
         filepath = os.path.join(VIDEO_DIR, filename)
-        height, width, _ = frames[0].shape
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(filepath, fourcc, FPS, (width, height))
-        for f in frames:
-            out.write(f)
+        out = cv2.VideoWriter(filepath, EVENT_FOURCC, FPS, (main_w, main_h))
+        for main_yuv, motion_boxes in frames:
+            out.write(render_event_frame(main_yuv, motion_boxes))
         out.release()
         logger.info(f"💾 Saved event video: {filepath}")
         send_mqtt_event(CAMERA_NAME, ts, filepath)
         return filepath
 
+    # Encoding an event clip and publishing it can take seconds on a Pi, so it
+    # is handed to a writer thread instead of stalling the motion loop. Each
+    # pending clip holds 100+ raw frames, so the backlog is bounded.
+    event_queue = queue.Queue(maxsize=2)
+
+    def event_writer_loop():
+        logger.info("💾 Event writer thread started")
+        lower_thread_priority()
+        while True:
+            frames, event_time = event_queue.get()
+            try:
+                save_event_video(frames, event_time)
+            except Exception as e:
+                logger.error(f"Failed to save event video: {e}", exc_info=True)
+
+    # Bounded handoff from capture to detection; the oldest frame is dropped
+    # when detection falls behind so capture never blocks.
+    frame_queue = queue.Queue(maxsize=2)
+
+    def capture_loop():
+        logger.info("📷 Frame capture thread started")
+        pin_thread(config.camera.capture_cpus)
+        # capture_request() already blocks for the next camera frame, so only wait
+        # out what is left of the FPS period rather than sleeping a full period on top
+        period = 1.0 / FPS
+        next_due = time.monotonic()
+        while True:
+            try:
+                delay = next_due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                # After a stall, restart the schedule instead of capturing a burst
+                next_due = max(next_due, time.monotonic()) + period
+                # Take both streams from the same request so they show the same instant
+                request = picam2.capture_request()
+                try:
+                    main_yuv = request.make_array("main")
+                    lores_yuv = request.make_array("lores")
+                finally:
+                    request.release()
+                # Detection only needs luma: the first lores_h rows of I420 are the
+                # Y plane, cropped of any stride padding past the visible width
+                lores_y = lores_yuv[:lores_h, :lores_w]
+                item = (main_yuv, lores_y)
+                try:
+                    frame_queue.put_nowait(item)
+                except queue.Full:
+                    try:
+                        frame_queue.get_nowait()
+                    except queue.Empty:
+                        pass
+                    frame_queue.put_nowait(item)
+            except Exception as e:
+                logger.error("Frame capture error: %s", e)
+                time.sleep(1)
+
     def opencv_motion_loop():
         logger.info("🔍 OpenCV motion detection thread started")
+        pin_thread(config.motion.cpus)
+        lower_thread_priority()
         event_frames = []
         last_event_time = None
+        detect_every = max(1, config.motion.detect_every)
+        frame_count = 0
+        motion_found, motion_boxes = False, []
         while True:
             try:
-                frame = picam2.capture_array("main")
-                frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                motion_found, motion_boxes = motion_detector.detect(frame_bgr)
-                annotated = motion_detector.draw_exclusion_boxes(frame_bgr.copy())
-                for (x, y, w, h) in motion_boxes:
-                    cv2.rectangle(annotated, (x, y), (x+w, y+h), (0, 255, 0), 2)
-                frame_buffer.append(annotated.copy())
+                main_yuv, lores_y = frame_queue.get()
+                # Motion between adjacent frames is small, so skipped frames
+                # reuse the last result rather than rerunning the detector
+                if frame_count % detect_every == 0:
+                    motion_found, motion_boxes = motion_detector.detect(lores_y)
+                frame_count += 1
+                # Most buffered frames are never saved, so keep the raw YUV and the
+                # boxes and leave conversion and annotation to the event writer
+                entry = (main_yuv, motion_boxes)
+                frame_buffer.append(entry)
                 if motion_found and not recording_event['active']:
-                    logger.info(f"🚨 Motion detected! Boxes: {motion_boxes}")
+                    logger.info("🚨 Motion detected! Boxes: %s", motion_boxes)
                     recording_event['active'] = True
                     post_event_frames['count'] = FPS * POST_EVENT_SEC
                     event_frames = list(frame_buffer)
-                    last_event_time = datetime.now()
+                    last_event_time = time.time()
                 if recording_event['active']:
-                    event_frames.append(annotated.copy())
+                    event_frames.append(entry)
                     if not motion_found:
                         post_event_frames['count'] -= 1
                     else:
                         post_event_frames['count'] = FPS * POST_EVENT_SEC
                     if post_event_frames['count'] <= 0:
-                        save_event_video(event_frames, last_event_time)
+                        try:
+                            event_queue.put_nowait((event_frames, last_event_time))
+                        except queue.Full:
+                            logger.warning("⚠️ Event writer is behind, dropping %d-frame clip from %s",
+                                           len(event_frames),
+                                           time.strftime("%Y%m%d_%H%M%S", time.localtime(last_event_time)))
                         recording_event['active'] = False
                         event_frames = []
                         post_event_frames['count'] = 0
-                time.sleep(1.0 / FPS)
             except Exception as e:
-                logger.error(f"OpenCV motion detection error: {e}")
+                logger.error("OpenCV motion detection error: %s", e)
                 time.sleep(1)
 
 
@@ -218,7 +418,6 @@ def start_camera_streaming(picam2, encoder, output):
             def write(self, data):
                 try:
                     self.fifo.write(data)
-                    logger.debug(f"FifoOutput: Wrote {len(data)} bytes to FIFO {self.fifo_path}")
                 except BrokenPipeError:
                     logger.error(f"FifoOutput: BrokenPipeError when writing to FIFO {self.fifo_path}")
             def flush(self):
@@ -255,8 +454,12 @@ def start_camera_streaming(picam2, encoder, output):
         logger.info("Starting Picamera2 recording with H.264 encoder and output...")
         picam2.start_recording(encoder, file_output)
         logger.info("Picamera2 recording started.")
+        writer = threading.Thread(target=event_writer_loop, daemon=True)
+        writer.start()
         t = threading.Thread(target=opencv_motion_loop, daemon=True)
         t.start()
+        capture = threading.Thread(target=capture_loop, daemon=True)
+        capture.start()
         logger.info("✅ Camera streaming started with motion detection and event handling")
         return True
     except Exception as e:
@@ -328,7 +531,7 @@ def start_rtsp_server(output, port=8554):
 
 
 # --- GStreamer RTSP Server Integration ---
-def start_gst_rtsp_server():
+def start_gst_rtsp_server(config):
     import gi
     gi.require_version('Gst', '1.0')
     gi.require_version('GstRtspServer', '1.0')
@@ -337,17 +540,7 @@ def start_gst_rtsp_server():
 
     Gst.init(None)
 
-    def get_ip():
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80))
-            ip = s.getsockname()[0]
-            s.close()
-            return ip
-        except Exception:
-            return "localhost"
-
-    fifo_path = "/tmp/picamera2_stream_fifo.h264"
+    fifo_path = FIFO_PATH
     class RTSPMediaFactory(GstRtspServer.RTSPMediaFactory):
         def __init__(self):
             super().__init__()
@@ -358,7 +551,7 @@ def start_gst_rtsp_server():
             self.set_launch(pipeline)
 
         def do_create_element(self, url):
-            logger.info(f"RTSPMediaFactory: Creating element for URL: {url}")
+            logger.info("RTSPMediaFactory: Creating element for URL: %s", url)
             return GstRtspServer.RTSPMediaFactory.do_create_element(self, url)
 
     class CustomRTSPServer(GstRtspServer.RTSPServer):
@@ -366,35 +559,20 @@ def start_gst_rtsp_server():
             super().__init__()
 
         def client_connected(self, client):
-            ip = client.get_connection().get_ip()
-            port = client.get_connection().get_port()
-            logger.info(f"RTSP client connected: {ip}:{port}")
+            conn = client.get_connection()
+            logger.info("RTSP client connected: %s:%s", conn.get_ip(), conn.get_port())
             return super().client_connected(client)
 
+    port = config.server.port
     server = CustomRTSPServer()
+    server.set_service(str(port))
     factory = RTSPMediaFactory()
     factory.set_shared(True)
     mounts = server.get_mount_points()
     mounts.add_factory("/stream", factory)
     server.attach(None)
     ip = get_ip()
-    logger.info(f"🟢 GStreamer RTSP server running at rtsp://{ip}:8554/stream")
-    # Run in a background thread
-    def run_loop():
-        loop = GLib.MainLoop()
-        loop.run()
-    t = threading.Thread(target=run_loop, daemon=True)
-    t.start()
-    return t
-
-    server = GstRtspServer.RTSPServer()
-    factory = RTSPMediaFactory()
-    factory.set_shared(True)
-    mounts = server.get_mount_points()
-    mounts.add_factory("/stream", factory)
-    server.attach(None)
-    ip = get_ip()
-    logger.info(f"🟢 GStreamer RTSP server running at rtsp://{ip}:8554/stream")
+    logger.info(f"🟢 GStreamer RTSP server running at rtsp://{ip}:{port}/stream")
     # Run in a background thread
     def run_loop():
         loop = GLib.MainLoop()
@@ -410,23 +588,19 @@ def main():
     logger.info("🚀 Starting RTSP Stream Server main()")
     picam2, encoder, fifo_path = initialize_camera(config)
     logger.info("🔧 Camera and encoder initialized. Starting streaming pipeline...")
-    # Open FIFO for reading in background to prevent deadlock
-    def keep_fifo_open_for_read(path):
-        with open(path, 'rb', buffering=0):
-            while True:
-                time.sleep(1)
-    fifo_reader_thread = threading.Thread(target=keep_fifo_open_for_read, args=(fifo_path,), daemon=True)
-    fifo_reader_thread.start()
+    # Hold a read end of the FIFO so opening it for writing does not block
+    # waiting for GStreamer; a non-blocking open returns without a writer
+    fifo_read_fd = os.open(fifo_path, os.O_RDONLY | os.O_NONBLOCK | os.O_CLOEXEC)
     # Pass both output and fifo_path to streaming logic (output=None means only RTSP streaming)
     output = (None, fifo_path)
     logger.info("🟢 Starting camera streaming (motion detection, event handling, SCP, MQTT)...")
-    started = start_camera_streaming(picam2, encoder, output)
+    started = start_camera_streaming(picam2, encoder, output, config)
     if started:
         logger.info("✅ Camera streaming pipeline is running.")
     else:
         logger.error("❌ Camera streaming pipeline failed to start.")
     # Start GStreamer RTSP server
-    gst_thread = start_gst_rtsp_server()
+    gst_thread = start_gst_rtsp_server(config)
     try:
         while True:
             time.sleep(1)
@@ -440,6 +614,7 @@ def main():
             picam2.close()
         except Exception:
             pass
+        os.close(fifo_read_fd)
         logger.info("📷 Camera closed. Goodbye!")
 
 if __name__ == "__main__":